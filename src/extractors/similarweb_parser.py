@@ -1,9 +1,14 @@
-import json
+import asyncio
 import logging
 import os
-from typing import Any, Dict, Optional
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
 
+import aiohttp
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 
 from .traffic_utils import (
     generate_mock_profile,
@@ -11,6 +16,13 @@ from .traffic_utils import (
     utc_now_iso,
 )
 
+def _section(data: Dict[str, Any], key: str) -> Dict[str, Any]:
+    """
+    Return data[key] when it is a dict, otherwise an empty dict.
+    """
+    value = data.get(key)
+    return value if isinstance(value, dict) else {}
+
 class SimilarwebParser:
     """
     High-level client that retrieves and normalizes Similarweb-like data
@@ -30,23 +42,121 @@ class SimilarwebParser:
         backoff_factor: float = 0.5,
         use_mock_data: bool = True,
         logger: Optional[logging.Logger] = None,
+        backoff_cap: float = 30.0,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.api_key_env = api_key_env
         self.timeout = timeout
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
+        self.backoff_cap = backoff_cap
         self.use_mock_data = use_mock_data
 
         self.logger = logger or logging.getLogger(self.__class__.__name__)
 
+        # One snapshot timestamp per batch rather than one clock read per record.
+        self._snapshot_ts = utc_now_iso()
+
+        # Resolve the API key once; it is read on every request otherwise.
+        self._api_key = os.environ.get(api_key_env)
+        self._has_key = bool(self._api_key)
+        if not self._has_key and not use_mock_data:
+            self.logger.warning(
+                "Environment variable %s not set; falling back to mock data.",
+                api_key_env,
+            )
+
+        self._session = self._build_session()
+
+    # Pickling -------------------------------------------------------------
+    #
+    # Parsers are shipped to worker processes in mock mode. Pooled sockets
+    # cannot cross a process boundary and the logger is looked up by name,
+    # so both are rebuilt on the other side.
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state.pop("_session", None)
+        state["logger"] = self.logger.name
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        state["logger"] = logging.getLogger(state["logger"])
+        self.__dict__.update(state)
+        self._session = self._build_session()
+
     # Public API -----------------------------------------------------------
 
-    def get_domain_data(self, domain: str) -> Dict[str, Any]:
+    def get_domain_data(self, domain: str, snapshot_ts: Optional[str] = None) -> Dict[str, Any]:
         """
         Fetch and normalize analytics data for a single domain.
         In mock mode, returns a deterministic synthetic profile.
+        snapshot_ts defaults to the parser's batch snapshot timestamp.
+        """
+        clean_domain, snapshot_ts, record = self._prepare(domain, snapshot_ts)
+        if record is not None:
+            return record
+
+        raw_response = self._fetch_raw_data(clean_domain)
+        return self._normalize_real_response(clean_domain, raw_response, snapshot_ts)
+
+    async def aget_domain_data(
+        self,
+        session: aiohttp.ClientSession,
+        domain: str,
+        snapshot_ts: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of get_domain_data that fetches through a shared
+        aiohttp session, so many domains can be in flight at once.
         """
+        clean_domain, snapshot_ts, record = self._prepare(domain, snapshot_ts)
+        if record is not None:
+            return record
+
+        raw_response = await self._afetch_raw_data(session, clean_domain)
+        return self._normalize_real_response(clean_domain, raw_response, snapshot_ts)
+
+    def refresh_snapshot(self) -> str:
+        """
+        Start a new batch: stamp subsequent records with the current time.
+        """
+        self._snapshot_ts = utc_now_iso()
+        return self._snapshot_ts
+
+    def close(self) -> None:
+        """
+        Release pooled HTTP connections held by the parser.
+        """
+        self._session.close()
+
+    # Internal helpers -----------------------------------------------------
+
+    def _build_session(self) -> requests.Session:
+        # One keep-alive session per parser so consecutive domains reuse the
+        # same TLS connection instead of re-handshaking on every request.
+        # Retries are handled in _fetch_raw_data, so the adapter does none.
+        session = requests.Session()
+        session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=10, pool_maxsize=max(10, self.max_retries * 4), max_retries=0),
+        )
+        session.headers.update({"Accept": "application/json", "Connection": "keep-alive"})
+        return session
+
+    def _has_api_key(self) -> bool:
+        return self._has_key
+
+    def _prepare(
+        self, domain: str, snapshot_ts: Optional[str]
+    ) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        """
+        Shared front half of get_domain_data/aget_domain_data: validate the
+        domain and resolve the snapshot timestamp. In mock mode the finished
+        record is returned as well; otherwise it is None and the caller
+        fetches real data.
+        """
+        snapshot_ts = snapshot_ts or self._snapshot_ts
         clean_domain = normalize_domain(domain)
         if not clean_domain:
             raise ValueError(f"Invalid domain: {domain!r}")
@@ -54,33 +164,20 @@ class SimilarwebParser:
         if self.use_mock_data or not self._has_api_key():
             self.logger.debug("Using mock traffic profile for %s", clean_domain)
             raw = generate_mock_profile(clean_domain)
-            return self._normalize_mock_response(raw)
+            return clean_domain, snapshot_ts, self._normalize_mock_response(raw, snapshot_ts)
 
         self.logger.debug("Fetching real data for %s", clean_domain)
-        raw_response = self._fetch_raw_data(clean_domain)
-        return self._normalize_real_response(clean_domain, raw_response)
+        return clean_domain, snapshot_ts, None
 
-    # Internal helpers -----------------------------------------------------
-
-    def _has_api_key(self) -> bool:
-        api_key = os.environ.get(self.api_key_env)
-        if not api_key:
-            self.logger.warning(
-                "Environment variable %s not set; falling back to mock data.",
-                self.api_key_env,
-            )
-            return False
-        return True
-
-    def _fetch_raw_data(self, domain: str) -> Dict[str, Any]:
+    def _request_args(self, domain: str) -> Tuple[str, Dict[str, str]]:
         """
-        Hit a Similarweb-like HTTP API with basic retry logic.
+        Build the URL and query parameters for a domain's overview request.
 
         Note: This is written to be realistic but does not depend on an
         actual API existing. In a production setting you would adjust the
         URL paths and query parameters to match Similarweb's contract.
         """
-        api_key = os.environ.get(self.api_key_env)
+        api_key = self._api_key
         if not api_key:
             raise RuntimeError(
                 f"API key not found in environment variable {self.api_key_env}"
@@ -91,52 +188,92 @@ class SimilarwebParser:
             "api_key": api_key,
             "format": "json",
         }
+        return url, params
+
+    def _log_bad_status(self, domain: str, status: int, body: str) -> None:
+        self.logger.warning(
+            "Non-success status code for %s: %s - body: %s",
+            domain,
+            status,
+            body[:300],
+        )
+
+    def _log_request_error(self, domain: str, attempt: int, exc: Exception) -> None:
+        self.logger.warning(
+            "Request error for domain %s (attempt %d/%d): %s",
+            domain,
+            attempt,
+            self.max_retries,
+            exc,
+        )
+
+    def _retries_exhausted(self, domain: str, last_exc: Optional[Exception]) -> Exception:
+        # Surface the last transport error if there was one
+        return last_exc or RuntimeError(f"Failed to retrieve data for {domain}")
+
+    def _fetch_raw_data(self, domain: str) -> Dict[str, Any]:
+        """
+        Hit a Similarweb-like HTTP API with basic retry logic.
+        """
+        url, params = self._request_args(domain)
 
         last_exc: Optional[Exception] = None
         for attempt in range(1, self.max_retries + 1):
             try:
-                resp = requests.get(url, params=params, timeout=self.timeout)
+                resp = self._session.get(url, params=params, timeout=self.timeout)
                 if 200 <= resp.status_code < 300:
-                    return resp.json()
-                self.logger.warning(
-                    "Non-success status code for %s: %s - body: %s",
-                    domain,
-                    resp.status_code,
-                    resp.text[:300],
-                )
+                    return orjson.loads(resp.content)
+                self._log_bad_status(domain, resp.status_code, resp.text)
             except Exception as exc:  # noqa: BLE001
                 last_exc = exc
-                self.logger.warning(
-                    "Request error for domain %s (attempt %d/%d): %s",
-                    domain,
-                    attempt,
-                    self.max_retries,
-                    exc,
-                )
+                self._log_request_error(domain, attempt, exc)
 
             if attempt < self.max_retries:
                 self._sleep_with_backoff(attempt)
 
-        # If we get here, all retries failed
-        if last_exc:
-            raise last_exc
-        raise RuntimeError(f"Failed to retrieve data for {domain}")
+        raise self._retries_exhausted(domain, last_exc)
 
-    def _sleep_with_backoff(self, attempt: int) -> None:
-        import time
+    async def _afetch_raw_data(self, session: aiohttp.ClientSession, domain: str) -> Dict[str, Any]:
+        """
+        Async variant of _fetch_raw_data with the same retry semantics.
+        """
+        url, params = self._request_args(domain)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
 
-        delay = self.backoff_factor * (2 ** (attempt - 1))
-        time.sleep(delay)
+        last_exc: Optional[Exception] = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with session.get(url, params=params, timeout=timeout) as resp:
+                    if 200 <= resp.status < 300:
+                        return orjson.loads(await resp.read())
+                    self._log_bad_status(domain, resp.status, await resp.text())
+            except Exception as exc:  # noqa: BLE001
+                last_exc = exc
+                self._log_request_error(domain, attempt, exc)
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+        raise self._retries_exhausted(domain, last_exc)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # "Full jitter": a random delay up to the capped exponential ceiling,
+        # so concurrent workers hitting a throttled endpoint don't retry in lockstep.
+        ceiling = min(self.backoff_cap, self.backoff_factor * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    def _sleep_with_backoff(self, attempt: int) -> None:
+        time.sleep(self._backoff_delay(attempt))
 
     # Normalization --------------------------------------------------------
 
-    def _normalize_mock_response(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+    def _normalize_mock_response(self, raw: Dict[str, Any], snapshot_ts: str) -> Dict[str, Any]:
         """
         Map mock profile into the documented schema.
         """
         return {
             "domain": raw["domain"],
-            "snapshotDate": utc_now_iso(),
+            "snapshotDate": snapshot_ts,
             "title": raw["title"],
             "description": raw["description"],
             "category": raw["category"],
@@ -156,31 +293,29 @@ class SimilarwebParser:
             "competitors": raw["competitors"],
         }
 
-    def _normalize_real_response(self, domain: str, raw: Dict[str, Any]) -> Dict[str, Any]:
+    def _normalize_real_response(
+        self, domain: str, raw: Dict[str, Any], snapshot_ts: str
+    ) -> Dict[str, Any]:
         """
         Example of how you might map a real API response into the
         standardized schema. This implementation is defensive and
         tolerant of missing fields.
         """
         overview = raw.get("overview", {})
+        # The response shape is fixed, so resolve each section once and read
+        # fields off it directly instead of walking a path per field.
+        traffic = _section(raw, "traffic")
+        engagement = _section(raw, "engagement")
+        meta = _section(raw, "meta")
+        ranking = _section(raw, "ranking")
 
-        def g(path: str, default: Any = None) -> Any:
-            # simple dotted-path getter
-            parts = path.split(".")
-            cur: Any = raw
-            for part in parts:
-                if not isinstance(cur, dict):
-                    return default
-                cur = cur.get(part)
-            return cur if cur is not None else default
-
-        estimated_visits = g("traffic.estimated_monthly_visits", {}) or {}
+        estimated_visits = traffic.get("estimated_monthly_visits") or {}
         # Ensure keys are strings and values are ints
         normalized_visits = {
             str(k): int(v) for k, v in estimated_visits.items() if isinstance(v, (int, float))
         }
 
-        top_countries = g("audience.top_countries", []) or []
+        top_countries = _section(raw, "audience").get("top_countries") or []
         norm_countries = []
         for c in top_countries:
             code = c.get("country_code")
@@ -193,14 +328,14 @@ class SimilarwebParser:
                     }
                 )
 
-        traffic_sources = g("traffic.sources", {}) or {}
+        traffic_sources = traffic.get("sources") or {}
         # Keep only simple numeric fractions
         norm_sources: Dict[str, float] = {}
         for key, val in traffic_sources.items():
             if isinstance(val, (int, float)):
                 norm_sources[key.title()] = float(val)
 
-        top_keywords_raw = g("traffic.top_keywords", []) or []
+        top_keywords_raw = traffic.get("top_keywords") or []
         norm_keywords = []
         for kw in top_keywords_raw:
             name = kw.get("keyword") or kw.get("name")
@@ -216,34 +351,46 @@ class SimilarwebParser:
                 )
 
         # country rank example
-        country_rank_raw = g("ranking.country") or {}
+        country_rank_raw = ranking.get("country") or {}
         country_rank = {
             "Country": country_rank_raw.get("name", ""),
             "CountryCode": country_rank_raw.get("code", ""),
             "Rank": country_rank_raw.get("rank", 0),
         }
 
+        global_rank = _section(ranking, "global").get("rank")
+        category_rank = _section(ranking, "category").get("rank")
+        # Exporters rely on every record sharing one schema, so competitors
+        # is always a list even if the API sends a scalar.
+        competitors = _section(raw, "competition").get("competitors")
+        if competitors is None:
+            competitors = []
+        elif isinstance(competitors, tuple):
+            competitors = list(competitors)
+        elif not isinstance(competitors, list):
+            competitors = [competitors]
+
         normalized = {
             "domain": domain,
-            "snapshotDate": utc_now_iso(),
-            "title": overview.get("title") or g("meta.title") or "",
-            "description": overview.get("description") or g("meta.description") or "",
-            "category": g("classification.category") or "",
-            "screenshot": g("meta.screenshot_url") or "",
-            "globalRank": g("ranking.global.rank", 0),
+            "snapshotDate": snapshot_ts,
+            "title": overview.get("title") or meta.get("title") or "",
+            "description": overview.get("description") or meta.get("description") or "",
+            "category": _section(raw, "classification").get("category") or "",
+            "screenshot": meta.get("screenshot_url") or "",
+            "globalRank": 0 if global_rank is None else global_rank,
             "countryRank": country_rank,
-            "categoryRank": str(g("ranking.category.rank", "")),
+            "categoryRank": "" if category_rank is None else str(category_rank),
             "estimatedMonthlyVisits": normalized_visits,
-            "bounceRate": f"{float(g('engagement.bounce_rate', 0.0)):.4f}",
-            "pagesPerVisit": f"{float(g('engagement.pages_per_visit', 0.0)):.2f}",
-            "visits": str(int(g("engagement.visits", 0))),
-            "timeOnSite": f"{float(g('engagement.time_on_site', 0.0)):.2f}",
+            "bounceRate": f"{float(engagement.get('bounce_rate') or 0.0):.4f}",
+            "pagesPerVisit": f"{float(engagement.get('pages_per_visit') or 0.0):.2f}",
+            "visits": str(int(engagement.get("visits") or 0)),
+            "timeOnSite": f"{float(engagement.get('time_on_site') or 0.0):.2f}",
             "topCountryShares": norm_countries,
             "trafficSources": norm_sources,
             "topKeywords": norm_keywords,
-            "isDataFromGA": bool(g("meta.is_from_ga", False)),
-            "competitors": g("competition.competitors", []),
+            "isDataFromGA": bool(meta.get("is_from_ga")),
+            "competitors": competitors,
         }
 
-        self.logger.debug("Normalized real response for %s: %s", domain, json.dumps(normalized)[:500])
+        self.logger.debug("Normalized real response for %s: %s", domain, orjson.dumps(normalized).decode()[:500])
         return normalized
\ No newline at end of file
@@ -1,23 +1,24 @@
+import functools
 import hashlib
 import logging
 import math
+import re
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List
 
 logger = logging.getLogger(__name__)
 
+# Optional scheme, then everything up to the first path, query or fragment.
+_HOST_RE = re.compile(r"^(?:[^:/?#]*://)?([^/?#]*)")
+
+@functools.lru_cache(maxsize=4096)
 def normalize_domain(domain: str) -> str:
     """
-    Basic domain normalization: strip scheme, path, and lowercase.
+    Basic domain normalization: strip scheme, path, query, fragment, and lowercase.
     """
     if not domain:
         return ""
-    d = domain.strip().lower()
-    if "://" in d:
-        d = d.split("://", 1)[1]
-    d = d.split("/", 1)[0]
-    d = d.split("?", 1)[0]
-    return d
+    return _HOST_RE.match(domain.strip()).group(1).lower()
 
 def utc_now_iso() -> str:
     """
@@ -26,8 +27,9 @@ def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
 def _hash_to_int(text: str) -> int:
-    h = hashlib.sha256(text.encode("utf-8")).hexdigest()
-    return int(h[:12], 16)
+    # First 6 bytes of SHA-256, read straight from the digest; equal to the
+    # old int(hexdigest()[:12], 16) so mock profiles stay stable.
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:6], "big")
 
 def _pseudo_random_float(seed: int, minimum: float, maximum: float) -> float:
     """
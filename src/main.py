@@ -1,9 +1,15 @@
 import argparse
+import asyncio
+import itertools
 import json
 import logging
 import os
 import sys
-from typing import Any, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
 
 from extractors.similarweb_parser import SimilarwebParser
 from outputs.exporters import export_data
@@ -63,24 +69,28 @@ def load_domains_from_csv(path: str) -> List[str]:
 
     domains: List[str] = []
     with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames or []
-
-        if "domain" in fieldnames:
-            for row in reader:
-                domain = (row.get("domain") or "").strip()
-                if domain:
-                    domains.append(domain)
+        # Single pass: inspect the first row to decide whether it is a header,
+        # then read only the domain column without building a dict per row.
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return []
+
+        header = [h.strip().lower() for h in first]
+        if "domain" in header:
+            col = header.index("domain")
+            rows: Iterable[List[str]] = reader
         else:
             # Fallback: treat first column as domain
-            f.seek(0)
-            simple_reader = csv.reader(f)
-            for row in simple_reader:
-                if not row:
-                    continue
-                domain = row[0].strip()
-                if domain and domain.lower() != "domain":
-                    domains.append(domain)
+            col = 0
+            rows = itertools.chain([first], reader)
+
+        for row in rows:
+            if len(row) <= col:
+                continue
+            domain = row[col].strip()
+            if domain and domain.lower() != "domain":
+                domains.append(domain)
 
     unique_domains = sorted(set(domains))
     return unique_domains
@@ -99,10 +109,105 @@ def build_parser_from_settings(settings: Dict[str, Any], cli_args: argparse.Name
         timeout=req_conf.get("timeout", 10),
         max_retries=req_conf.get("max_retries", 3),
         backoff_factor=req_conf.get("backoff_factor", 0.5),
+        backoff_cap=req_conf.get("backoff_cap", 30.0),
         use_mock_data=use_mock_data,
     )
     return parser
 
+# Below this many domains, process start-up costs more than mock generation.
+MOCK_POOL_THRESHOLD = 200
+
+_worker_parser: Optional[SimilarwebParser] = None
+
+def _init_mock_worker(parser: SimilarwebParser) -> None:
+    global _worker_parser
+    _worker_parser = parser
+
+def _mock_worker(domain: str) -> Optional[Dict[str, Any]]:
+    try:
+        return _worker_parser.get_domain_data(domain)
+    except Exception:
+        logging.getLogger("main").exception("Failed to fetch data for domain '%s'", domain)
+        return None
+
+def available_cpus() -> int:
+    """
+    CPUs this process may actually run on (respects affinity and cgroup
+    cpusets where the platform exposes them), not the host core count.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def run_mock_pool(
+    domains: List[str], parser: SimilarwebParser, workers: int
+) -> List[Dict[str, Any]]:
+    """
+    Generate mock profiles across CPU cores. The work is pure CPU, so
+    threads would serialize on the GIL; processes scale with cores.
+    """
+    logger = logging.getLogger("main")
+    logger.info("Generating %d mock profiles across %d processes", len(domains), workers)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_mock_worker,
+        initargs=(parser,),
+    ) as ex:
+        records = list(ex.map(_mock_worker, domains, chunksize=64))
+    return [r for r in records if r is not None]
+
+def build_resolver() -> AbstractResolver:
+    """
+    Prefer aiodns-backed resolution, which does not tie up the thread pool
+    with getaddrinfo calls. Falls back to the default resolver when aiodns
+    is not installed.
+    """
+    try:
+        return aiohttp.AsyncResolver()
+    except RuntimeError:
+        logging.getLogger("main").debug("aiodns not available; using threaded DNS resolver")
+        return aiohttp.ThreadedResolver()
+
+async def run_all(
+    domains: List[str],
+    parser: SimilarwebParser,
+    concurrency: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch all domains concurrently over a single aiohttp session.
+    Failed domains are logged and skipped; input order is preserved.
+    """
+    logger = logging.getLogger("main")
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(domains)
+
+    async def sem_bound(
+        session: aiohttp.ClientSession, idx: int, domain: str
+    ) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            try:
+                logger.info("Processing %d/%d: %s", idx, total, domain)
+                return await parser.aget_domain_data(session, domain)
+            except Exception:
+                logger.exception("Failed to fetch data for domain '%s'", domain)
+                return None
+
+    connector = aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=20,
+        use_dns_cache=True,
+        ttl_dns_cache=600,
+        resolver=build_resolver(),
+    )
+    async with aiohttp.ClientSession(
+        connector=connector,
+        headers={"Accept": "application/json"},
+    ) as session:
+        records = await asyncio.gather(
+            *[sem_bound(session, idx, domain) for idx, domain in enumerate(domains, start=1)]
+        )
+    return [r for r in records if r is not None]
+
 def main() -> int:
     args = parse_args()
     try:
@@ -137,13 +242,23 @@ def main() -> int:
 
     parser = build_parser_from_settings(settings, args)
     results: List[Dict[str, Any]] = []
-    for idx, domain in enumerate(domains, start=1):
-        try:
-            logger.info("Processing %d/%d: %s", idx, len(domains), domain)
-            record = parser.get_domain_data(domain)
-            results.append(record)
-        except Exception as e:
-            logger.exception("Failed to fetch data for domain '%s'", domain)
+    try:
+        workers = available_cpus()
+        if parser.use_mock_data and len(domains) > MOCK_POOL_THRESHOLD and workers > 1:
+            results = run_mock_pool(domains, parser, workers)
+        elif parser.use_mock_data:
+            # Mock profiles are pure CPU work; an event loop would only add overhead.
+            for idx, domain in enumerate(domains, start=1):
+                try:
+                    logger.info("Processing %d/%d: %s", idx, len(domains), domain)
+                    record = parser.get_domain_data(domain)
+                    results.append(record)
+                except Exception as e:
+                    logger.exception("Failed to fetch data for domain '%s'", domain)
+        else:
+            results = asyncio.run(run_all(domains, parser))
+    finally:
+        parser.close()
 
     if not results:
         logger.error("No data could be retrieved for any domain.")
@@ -1,29 +1,79 @@
-import json
+import csv
+import itertools
 import logging
 import os
-from typing import Any, Dict, Iterable, List
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List
 
-import pandas as pd
+import orjson
+import xlsxwriter
 
 logger = logging.getLogger(__name__)
 
 def _ensure_parent_dir(path: str) -> None:
     parent = os.path.dirname(path)
-    if parent and not os.path.exists(parent):
+    if parent:
         os.makedirs(parent, exist_ok=True)
 
-def _flatten_record(record: Dict[str, Any]) -> Dict[str, Any]:
+def _record_flattener(first: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
     """
-    Flatten nested fields for CSV/XLSX export. Complex structures
-    are stored as JSON strings.
+    Build a flattener for CSV/XLSX export. Complex structures are stored
+    as JSON strings. All records share one schema, so which keys hold
+    nested values is decided once from the first record instead of
+    type-checking every field of every record.
     """
-    flattened: Dict[str, Any] = {}
-    for key, value in record.items():
-        if isinstance(value, (dict, list)):
-            flattened[key] = json.dumps(value, ensure_ascii=False)
-        else:
-            flattened[key] = value
-    return flattened
+    complex_keys = [k for k, v in first.items() if isinstance(v, (dict, list))]
+    scalar_keys = [k for k in first if k not in complex_keys]
+
+    def flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+        flattened = {k: record[k] for k in scalar_keys}
+        for k in complex_keys:
+            value = record[k]
+            flattened[k] = (
+                "" if value is None else orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+            )
+        return flattened
+
+    return flatten
+
+# Excel's per-cell string limit.
+_XLSX_STRMAX = 32767
+
+def _write_xlsx_row(sheet: Any, row: int, values: List[Any]) -> None:
+    # Over-long strings are truncated up front, as pandas did, because
+    # write_row stops at the first cell that fails and would drop the rest
+    # of the row. Any other failure only surfaces as a return code, so it
+    # is raised rather than leaving a partial row behind.
+    for idx, value in enumerate(values):
+        if isinstance(value, str) and len(value) > _XLSX_STRMAX:
+            logger.warning(
+                "Cell contents too long in XLSX row %d, column %d; truncated to %d characters",
+                row,
+                idx,
+                _XLSX_STRMAX,
+            )
+            values[idx] = value[:_XLSX_STRMAX]
+    status = sheet.write_row(row, 0, values)
+    if status != 0:
+        raise RuntimeError(f"Failed to write XLSX row {row} (xlsxwriter status {status})")
+
+_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+def _stream_json(records: Iterable[Dict[str, Any]], fp: BinaryIO) -> int:
+    """
+    Write records as an indented UTF-8 JSON array one element at a time,
+    without holding the whole document in memory. Returns the number of
+    records written.
+    """
+    count = 0
+    fp.write(b"[")
+    for record in records:
+        if count:
+            fp.write(b",")
+        fp.write(b"\n  ")
+        fp.write(orjson.dumps(record, option=_JSON_OPTIONS).replace(b"\n", b"\n  "))
+        count += 1
+    fp.write(b"\n]" if count else b"]")
+    return count
 
 def export_data(
     records: Iterable[Dict[str, Any]],
@@ -32,31 +82,54 @@ def export_data(
 ) -> None:
     """
     Export analytics records to JSON, CSV, or Excel.
+
+    All formats are streamed record by record; CSV/XLSX columns are taken
+    from the first record, since every normalized record shares one schema.
     """
     output_format = output_format.lower()
-    records_list: List[Dict[str, Any]] = list(records)
-    if not records_list:
+    if output_format not in ("json", "csv", "xlsx"):
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    it = iter(records)
+    first = next(it, None)
+    if first is None:
         raise ValueError("No records to export")
+    all_records = itertools.chain([first], it)
 
     _ensure_parent_dir(output_path)
-    logger.info(
-        "Exporting %d records to %s (%s)",
-        len(records_list),
-        output_path,
-        output_format,
-    )
+    logger.info("Exporting records to %s (%s)", output_path, output_format)
 
     if output_format == "json":
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(records_list, f, ensure_ascii=False, indent=2)
-        return
-
-    flattened = [_flatten_record(r) for r in records_list]
-    df = pd.DataFrame(flattened)
-
-    if output_format == "csv":
-        df.to_csv(output_path, index=False)
-    elif output_format == "xlsx":
-        df.to_excel(output_path, index=False)
+        with open(output_path, "wb") as f:
+            count = _stream_json(all_records, f)
+    elif output_format == "csv":
+        flatten = _record_flattener(first)
+        count = 0
+        with open(output_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(first))
+            writer.writeheader()
+            for record in all_records:
+                writer.writerow(flatten(record))
+                count += 1
     else:
-        raise ValueError(f"Unsupported output format: {output_format}")
\ No newline at end of file
+        # constant_memory flushes each row to disk as it is written, so
+        # memory stays flat regardless of how many records are exported.
+        flatten = _record_flattener(first)
+        columns = list(first)
+        # strings_to_urls is off so URLs stay plain strings, as they were
+        # with pandas; Excel caps hyperlinks at 65,530 per sheet.
+        workbook = xlsxwriter.Workbook(
+            output_path,
+            {"constant_memory": True, "strings_to_urls": False},
+        )
+        try:
+            sheet = workbook.add_worksheet()
+            _write_xlsx_row(sheet, 0, columns)
+            count = 0
+            for count, record in enumerate(all_records, start=1):
+                flattened = flatten(record)
+                _write_xlsx_row(sheet, count, [flattened[k] for k in columns])
+        finally:
+            workbook.close()
+
+    logger.info("Exported %d records to %s", count, output_path)